@@ -1,7 +1,21 @@
 import json
+import re
 import time
 from abc import ABC, abstractmethod
 from typing import Dict, List, Any
+from config import Config
+from services.offer_parser import OfferParser
+from services.tracing_service import tracer
+
+OUT_OF_CHARACTER_PATTERN = re.compile(
+    r"\bas an ai\b|\blanguage model\b|\bi(?:'m| am) an ai\b",
+    re.IGNORECASE
+)
+
+# Hard failures drop a candidate; soft ones only lower its score. Prices are
+# soft because the parser can pick up a quoted counterpart price.
+HARD_REJECTIONS = ('api_error', 'out_of_character')
+SOFT_PENALTIES = {'too_long': 1, 'over_concession': 2, 'out_of_bounds': 3, 'no_offer': 0.5}
 
 class BaseAgent(ABC):
     def __init__(self, name: str, role: str, personality: str):
@@ -13,6 +27,8 @@ class BaseAgent(ABC):
         self.target_price = None
         self.min_acceptable = None
         self.max_acceptable = None
+        self.offer_parser = OfferParser()
+        self.last_candidate_report = None
         
     @abstractmethod
     def generate_response(self, message: str, context: Dict) -> str:
@@ -42,8 +58,85 @@ class BaseAgent(ABC):
             'target_price': self.target_price
         }
     
+    def snapshot_state(self) -> Dict:
+        """Capture the state a generated response mutates"""
+        return {
+            'history_length': len(self.conversation_history),
+            'current_offer': self.current_offer,
+            'last_candidate_report': self.last_candidate_report
+        }
+    
+    def restore_state(self, snapshot: Dict):
+        """Roll back a response that was generated but never used"""
+        del self.conversation_history[snapshot['history_length']:]
+        self.current_offer = snapshot['current_offer']
+        self.last_candidate_report = snapshot['last_candidate_report']
+    
     def set_negotiation_params(self, target: float, min_price: float, max_price: float):
         """Set negotiation parameters"""
         self.target_price = target
         self.min_acceptable = min_price
         self.max_acceptable = max_price
+        self.current_offer = None
+
+    
+    def generate_best_response(self, prompt: str, context: Dict, word_limit: int = None) -> str:
+        """Request several candidates in one model call and keep the best one"""
+        candidates = self.llama_service.generate_candidates(
+            prompt, context, Config.CANDIDATES_PER_TURN
+        )
+        with tracer.span('select_candidate'):
+            return self.select_candidate(candidates, word_limit or Config.RESPONSE_WORD_LIMIT)
+    
+    def select_candidate(self, candidates: List[str], word_limit: int) -> str:
+        """Score candidates against the agent's bounds and pick the best"""
+        scored = []
+        for index, candidate in enumerate(candidates):
+            reasons = self._candidate_issues(candidate, word_limit)
+            if any(reason in HARD_REJECTIONS for reason in reasons):
+                score = float('-inf')
+            else:
+                score = -sum(SOFT_PENALTIES[reason] for reason in reasons)
+            scored.append((score, index, reasons))
+        
+        # Highest score wins, earliest candidate breaks ties
+        best_score, best_index, _ = max(scored, key=lambda item: (item[0], -item[1]))
+        chosen = candidates[best_index]
+        
+        offer = self.offer_parser.parse(chosen, self.role)
+        if offer is not None:
+            self.current_offer = offer.price
+        
+        self.last_candidate_report = {
+            'count': len(candidates),
+            'chosen': best_index,
+            'rejections': [
+                {'index': index, 'reasons': reasons}
+                for score, index, reasons in scored if reasons
+            ]
+        }
+        return chosen
+    
+    def _candidate_issues(self, candidate: str, word_limit: int) -> List[str]:
+        """List the reasons a candidate response falls short"""
+        issues = []
+        if candidate.startswith('❌') or candidate.startswith('Unexpected response structure'):
+            return ['api_error']
+        
+        if OUT_OF_CHARACTER_PATTERN.search(candidate):
+            issues.append('out_of_character')
+        if len(candidate.split()) > word_limit:
+            issues.append('too_long')
+        
+        offer = self.offer_parser.parse(candidate, self.role)
+        if offer is None:
+            issues.append('no_offer')
+            return issues
+        
+        if not self.evaluate_offer({'price': offer.price}):
+            issues.append('out_of_bounds')
+        elif self.current_offer is not None and self.target_price:
+            concession = abs(offer.price - self.current_offer)
+            if concession > Config.MAX_CONCESSION * self.target_price:
+                issues.append('over_concession')
+        return issues
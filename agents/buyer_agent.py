@@ -2,6 +2,7 @@ import json
 from typing import Dict
 from agents.base_agent import BaseAgent
 from services.llama_service import LlamaService
+from services.tracing_service import tracer
 
 class BuyerAgent(BaseAgent):
     def __init__(self, name: str = "Alex the Buyer"):
@@ -18,6 +19,15 @@ class BuyerAgent(BaseAgent):
         negotiation_context = self.get_negotiation_context()
         negotiation_context.update(context)
         
+        with tracer.span('build_prompt'):
+            prompt = self._build_response_prompt(message, context)
+        
+        response = self.generate_best_response(prompt, negotiation_context)
+        self.add_to_history(response, self.name)
+        return response
+    
+    def _build_response_prompt(self, message: str, context: Dict) -> str:
+        """Build the prompt for a buyer reply"""
         # Build prompt for buyer
         prompt = f"""
         NEGOTIATION CONTEXT:
@@ -40,10 +50,7 @@ class BuyerAgent(BaseAgent):
         
         Generate your response:
         """
-        
-        response = self.llama_service.generate_response(prompt, negotiation_context)
-        self.add_to_history(response, self.name)
-        return response
+        return prompt
     
     def evaluate_offer(self, offer: Dict) -> bool:
         """Evaluate if seller's offer is acceptable"""
@@ -74,7 +81,7 @@ class BuyerAgent(BaseAgent):
         Keep it under 80 words and sound natural.
         """
         
-        response = self.llama_service.generate_response(prompt, self.get_negotiation_context())
+        response = self.generate_best_response(prompt, self.get_negotiation_context(), word_limit=80)
         self.add_to_history(response, self.name)
         return response
     
@@ -1,7 +1,10 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
 from flask_socketio import SocketIO, emit
 import json
 from services.negotiation_service import NegotiationService
+from services.metrics_service import registry, ACTIVE_SESSIONS
+from services.tracing_service import tracer
+from services.cassette_service import cassette, cassette_path
 from config import Config
 
 app = Flask(__name__)
@@ -10,6 +13,18 @@ socketio = SocketIO(app, cors_allowed_origins="*")
 
 # Global negotiation service
 negotiation_service = NegotiationService()
+if Config.CATALOG_PATH:
+    negotiation_service.catalog.load(Config.CATALOG_PATH)
+    negotiation_service.catalog.precompute_listings()
+ACTIVE_SESSIONS.set_function(lambda: int(negotiation_service.negotiation_active))
+
+def traced_jsonify(result: dict):
+    """Serialize a traced result, attaching its trace id and closing the trace"""
+    result['trace_id'] = tracer.current_trace_id()
+    with tracer.span('serialize'):
+        response = jsonify(result)
+    tracer.finish_trace()
+    return response
 
 @app.route('/')
 def index():
@@ -19,6 +34,7 @@ def index():
 @app.route('/api/start_negotiation', methods=['POST'])
 def start_negotiation():
     """Start a new negotiation session"""
+    tracer.start_trace('start_negotiation')
     try:
         data = request.json
         
@@ -32,34 +48,46 @@ def start_negotiation():
             buyer_max=float(data['buyer_max'])
         )
         
-        return jsonify(result)
+        return traced_jsonify(result)
         
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+        return traced_jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/buyer_respond', methods=['POST'])
 def buyer_respond():
     """Process buyer response"""
+    tracer.start_trace('buyer_respond')
     try:
         data = request.json
         result = negotiation_service.process_buyer_response(data)
-        return jsonify(result)
+        return traced_jsonify(result)
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+        return traced_jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/seller_respond', methods=['POST'])
 def seller_respond():
     """Process seller response"""
+    tracer.start_trace('seller_respond')
     try:
         data = request.json
         result = negotiation_service.process_seller_response(data)
+        return traced_jsonify(result)
+    except Exception as e:
+        return traced_jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/intervene', methods=['POST'])
+def intervene():
+    """Insert a human-written message for the buyer or seller"""
+    try:
+        data = request.json
+        result = negotiation_service.intervene(data['speaker'], data['message'])
         return jsonify(result)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
 @app.route('/api/auto_negotiate', methods=['POST'])
 def auto_negotiate():
-    """Run automatic negotiation"""
+    """Run automatic negotiation; each turn is traced on its own"""
     try:
         data = request.json
         rounds = data.get('rounds', 5)
@@ -68,6 +96,49 @@ def auto_negotiate():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/catalog', methods=['GET'])
+def catalog():
+    """Search catalog products by category and price range"""
+    try:
+        min_price = request.args.get('min_price', type=float)
+        max_price = request.args.get('max_price', type=float)
+        products = negotiation_service.catalog.find(
+            category=request.args.get('category'),
+            min_price=min_price,
+            max_price=max_price,
+            limit=request.args.get('limit', 50, type=int)
+        )
+        return jsonify({
+            'success': True,
+            'products': [product.to_dict() for product in products],
+            'categories': negotiation_service.catalog.get_categories()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/catalog/start_negotiation', methods=['POST'])
+def start_catalog_negotiation():
+    """Start a negotiation on a catalog product"""
+    tracer.start_trace('start_catalog_negotiation')
+    try:
+        data = request.json
+        
+        optional = {}
+        for field in ('seller_cost', 'seller_target', 'seller_min'):
+            if data.get(field) is not None:
+                optional[field] = float(data[field])
+        
+        result = negotiation_service.start_catalog_negotiation(
+            product_id=str(data['product_id']),
+            buyer_target=float(data['buyer_target']),
+            buyer_max=float(data['buyer_max']),
+            **optional
+        )
+        return traced_jsonify(result)
+        
+    except Exception as e:
+        return traced_jsonify({'success': False, 'error': str(e)})
+
 @app.route('/api/negotiation_status', methods=['GET'])
 def negotiation_status():
     """Get current negotiation status"""
@@ -77,6 +148,45 @@ def negotiation_status():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose metrics in Prometheus text format"""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/admin/traces', methods=['GET'])
+def admin_traces():
+    """List recent turn traces, optionally only the slow ones"""
+    slow_only = request.args.get('slow') in ('1', 'true')
+    return jsonify({'success': True, 'traces': tracer.get_recent_traces(slow_only)})
+
+@app.route('/api/admin/profiling', methods=['GET', 'POST'])
+def admin_profiling():
+    """Get or change the fraction of turns run under cProfile"""
+    try:
+        if request.method == 'POST':
+            data = request.json
+            tracer.set_profiling(float(data['rate']))
+        return jsonify({'success': True, 'profiling': tracer.get_profiling()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/admin/cassette', methods=['GET', 'POST'])
+def admin_cassette():
+    """Get or switch model traffic recording/replay"""
+    try:
+        if request.method == 'POST':
+            data = request.json
+            mode = data.get('mode')
+            path = cassette_path(data.get('name', 'negotiation')) if mode else None
+            cassette.configure(mode, path, data.get('latency', 'original'))
+        return jsonify({'success': True, 'cassette': {
+            'mode': cassette.mode,
+            'path': cassette.path,
+            'latency': cassette.replay_latency
+        }})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
 # WebSocket events for real-time communication
 @socketio.on('connect')
 def handle_connect():
@@ -16,6 +16,36 @@ class Config:
     MAX_ROUNDS = 10
     TIMEOUT_SECONDS = 30
     
+    # Stalemate Detection
+    STALEMATE_ROUNDS = 3  # rounds without the offer gap shrinking
+    CONVERGENCE_TOLERANCE = 0.02  # gap as a fraction of the seller's offer
+    
+    # Candidate Generation
+    CANDIDATES_PER_TURN = 3  # completions requested per model call
+    RESPONSE_WORD_LIMIT = 100
+    MAX_CONCESSION = 0.1  # largest price move per turn as a fraction of target
+    
+    # Start the counterpart's model call while the current turn is voiced
+    SPECULATIVE_TURNS = True
+    
+    # Tracing and Profiling
+    SLOW_TURN_SECONDS = 5.0
+    TRACE_HISTORY = 100  # finished traces kept for /api/admin/traces
+    PROFILE_SAMPLE_RATE = 0.0  # fraction of turns run under cProfile
+    PROFILE_DIR = 'profiles'
+    
+    # Model Traffic Cassettes: 'record', 'replay' or unset to call the API
+    CASSETTE_MODE = os.environ.get('CASSETTE_MODE') or None
+    CASSETTE_DIR = os.environ.get('CASSETTE_DIR') or 'cassettes'
+    CASSETTE_PATH = os.environ.get('CASSETTE_PATH') or os.path.join(CASSETTE_DIR, 'negotiation.jsonl.gz')
+    CASSETTE_REPLAY_LATENCY = os.environ.get('CASSETTE_REPLAY_LATENCY') or 'original'  # or 'zero'
+    
+    # Product Catalog
+    CATALOG_PATH = os.environ.get('CATALOG_PATH')  # .jsonl or .csv, loaded at startup
+    CATALOG_PRICE_BANDS = (10, 25, 50, 100, 250, 500, 1000, 5000)
+    CATALOG_SELLER_MIN_RATIO = 0.8  # default seller minimum as a fraction of base price
+    CATALOG_COST_RATIO = 0.5  # default seller cost as a fraction of base price
+    
     # Voice Settings
     VOICE_ENABLED = True
     TTS_RATE = 150
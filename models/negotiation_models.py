@@ -10,9 +10,11 @@ class Product:
     specifications: Dict[str, Any] = field(default_factory=dict)
     base_price: float = 0.0
     unit: str = "piece"
+    product_id: str = ""
     
     def to_dict(self):
         return {
+            'product_id': self.product_id,
             'name': self.name,
             'category': self.category,
             'specifications': self.specifications,
@@ -50,6 +52,8 @@ class NegotiationSession:
     offers_history: List[NegotiationOffer] = field(default_factory=list)
     status: str = "active"  # active, completed, failed
     final_price: Optional[float] = None
+    gap_history: List[float] = field(default_factory=list)
+    end_reason: Optional[str] = None  # converged, oscillating, no_progress, no_agreement_zone
     
     def add_offer(self, offer: NegotiationOffer):
         self.offers_history.append(offer)
@@ -58,6 +62,78 @@ class NegotiationSession:
         else:
             self.current_seller_offer = offer.price
     
+    def get_offer_trail(self, agent_type: str) -> List[float]:
+        """Get the prices offered so far by one side"""
+        return [offer.price for offer in self.offers_history if offer.agent_type == agent_type]
+    
+    def get_offer_gap(self) -> Optional[float]:
+        """Get the distance between the seller's and buyer's current offers"""
+        if self.current_buyer_offer is None or self.current_seller_offer is None:
+            return None
+        return self.current_seller_offer - self.current_buyer_offer
+    
+    def record_gap(self):
+        """Record the current offer gap at the end of a round"""
+        gap = self.get_offer_gap()
+        if gap is not None:
+            self.gap_history.append(gap)
+    
+    def has_agreement_zone(self) -> bool:
+        """Check whether any price satisfies both the buyer and the seller"""
+        return self.buyer_max_price >= self.seller_min_price
+    
+    def is_gap_stalled(self, rounds: int, tolerance: float = 0.0) -> bool:
+        """Check if the offer gap has not shrunk over the last few rounds"""
+        recent = self.gap_history[-(rounds + 1):]
+        if len(recent) <= rounds:
+            return False
+        # A gap this small means the sides have met, not stalled
+        if recent[-1] <= tolerance:
+            return False
+        return all(later >= earlier for earlier, later in zip(recent, recent[1:]))
+    
+    def last_offer_moved(self) -> bool:
+        """Check the latest offer is a new position for the side that made it"""
+        if not self.offers_history:
+            return False
+        trail = self.get_offer_trail(self.offers_history[-1].agent_type)
+        return len(trail) >= 2 and trail[-1] != trail[-2]
+    
+    def detect_stalemate(self, rounds: int, tolerance_ratio: float) -> Optional[Dict[str, Any]]:
+        """Detect convergence, oscillation or impasse from the offer trail"""
+        if not self.has_agreement_zone():
+            return {'reason': 'no_agreement_zone'}
+        
+        gap = self.get_offer_gap()
+        tolerance = tolerance_ratio * self.current_seller_offer if gap is not None else 0.0
+        if gap is not None and gap <= tolerance and self.last_offer_moved():
+            # Offers met or crossed: settle at the seller's price, otherwise split the difference
+            if gap <= 0:
+                price = self.current_seller_offer
+            else:
+                price = round((self.current_buyer_offer + self.current_seller_offer) / 2, 2)
+            # A price outside either side's limits is a misread, not a deal
+            if self.seller_min_price <= price <= self.buyer_max_price:
+                return {'reason': 'converged', 'price': price}
+        
+        if self.is_oscillating('buyer', rounds) or self.is_oscillating('seller', rounds):
+            return {'reason': 'oscillating'}
+        
+        if self.is_gap_stalled(rounds, tolerance):
+            return {'reason': 'no_progress'}
+        
+        return None
+    
+    def is_oscillating(self, agent_type: str, rounds: int) -> bool:
+        """Check if one side keeps reversing the direction of its offers"""
+        trail = self.get_offer_trail(agent_type)[-(rounds + 1):]
+        if len(trail) <= rounds:
+            return False
+        moves = [later - earlier for earlier, later in zip(trail, trail[1:])]
+        if any(move == 0 for move in moves):
+            return False
+        return all((a > 0) != (b > 0) for a, b in zip(moves, moves[1:]))
+    
     def to_dict(self):
         return {
             'session_id': self.session_id,
@@ -68,5 +144,7 @@ class NegotiationSession:
             'current_seller_offer': self.current_seller_offer,
             'offers_history': [offer.to_dict() for offer in self.offers_history],
             'status': self.status,
-            'final_price': self.final_price
+            'final_price': self.final_price,
+            'gap_history': self.gap_history,
+            'end_reason': self.end_reason
         }
\ No newline at end of file
@@ -0,0 +1,112 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+from config import Config
+
+# Request fields that decide the completion; anything else is ignored when keying
+KEY_FIELDS = ('model', 'messages', 'max_tokens', 'temperature', 'top_p', 'n')
+
+CASSETTE_NAME_PATTERN = re.compile(r'[A-Za-z0-9_-]+')
+CASSETTE_SUFFIX = '.jsonl.gz'
+
+
+class Cassette:
+    def __init__(self, mode: Optional[str] = None, path: Optional[str] = None,
+                 replay_latency: str = 'original'):
+        self.lock = threading.Lock()
+        self.configure(mode, path, replay_latency)
+
+    def configure(self, mode: Optional[str], path: Optional[str], replay_latency: str = 'original'):
+        """Switch between 'record', 'replay' or pass-through (None)"""
+        if mode not in (None, 'record', 'replay'):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if mode and not path:
+            raise ValueError("A cassette path is required to record or replay")
+        if replay_latency not in ('original', 'zero'):
+            raise ValueError(f"Unknown replay latency: {replay_latency}")
+
+        # Read before switching so a bad file leaves the current mode in place
+        interactions = self._read(path) if mode == 'replay' else {}
+
+        with self.lock:
+            self.mode = mode
+            self.path = path
+            self.replay_latency = replay_latency
+            self.interactions = interactions
+            self.positions = {}
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == 'record'
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == 'replay'
+
+    def record(self, payload: Dict, candidates: List[str], latency: float, usage: Dict = None,
+               error: Optional[str] = None):
+        """Append one request/response pair, successful or failed, to the cassette file"""
+        entry = {
+            'key': self.request_key(payload),
+            'request': {field: payload.get(field) for field in KEY_FIELDS},
+            'candidates': candidates,
+            'latency': round(latency, 4),
+            'usage': usage or {},
+            'error': error
+        }
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+
+        with self.lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with gzip.open(self.path, 'at', encoding='utf-8') as handle:
+                handle.write(line)
+
+    def replay(self, payload: Dict) -> Optional[Dict]:
+        """Serve the recorded entry for a request, or None if it was never seen"""
+        key = self.request_key(payload)
+        with self.lock:
+            entries = self.interactions.get(key)
+            if not entries:
+                return None
+            # Identical requests are answered in recorded order, then the last one repeats
+            position = self.positions.get(key, 0)
+            entry = entries[min(position, len(entries) - 1)]
+            self.positions[key] = position + 1
+
+        if self.replay_latency == 'original':
+            time.sleep(entry['latency'])
+        return {'candidates': list(entry['candidates']), 'error': entry.get('error')}
+
+    def request_key(self, payload: Dict) -> str:
+        """Hash the parts of a request that determine its completion"""
+        request = {field: payload.get(field) for field in KEY_FIELDS}
+        encoded = json.dumps(request, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _read(self, path: str) -> Dict[str, List[Dict]]:
+        """Index a cassette file by request key"""
+        interactions = {}
+        with gzip.open(path, 'rt', encoding='utf-8') as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                interactions.setdefault(entry['key'], []).append(entry)
+        return interactions
+
+
+def cassette_path(name: str) -> str:
+    """Resolve a cassette name to a file inside CASSETTE_DIR"""
+    if not CASSETTE_NAME_PATTERN.fullmatch(name or ''):
+        raise ValueError("Cassette names may only contain letters, digits, '_' and '-'")
+    return os.path.join(Config.CASSETTE_DIR, name + CASSETTE_SUFFIX)
+
+
+cassette = Cassette(Config.CASSETTE_MODE, Config.CASSETTE_PATH, Config.CASSETTE_REPLAY_LATENCY)
@@ -0,0 +1,229 @@
+import bisect
+import csv
+import json
+import logging
+import sys
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional
+from config import Config
+from models.negotiation_models import Product
+
+# Columns with a fixed meaning; any other CSV column becomes a specification
+CORE_FIELDS = ('product_id', 'name', 'category', 'base_price', 'unit', 'specifications', 'listing')
+
+logger = logging.getLogger(__name__)
+
+
+class ProductCatalog:
+    def __init__(self, price_bands: Iterable[float] = None):
+        self.lock = threading.RLock()
+        self.band_edges = sorted(price_bands or Config.CATALOG_PRICE_BANDS)
+
+        # Column storage keeps large catalogs compact; Products are built on access
+        self.ids = []
+        self.names = []
+        self.categories = []
+        self.units = []
+        self.prices = array('d')
+        self.specifications = []  # compact JSON strings
+        self.row_by_id = {}
+
+        self.category_index = {}
+        self.band_index = {}
+        self.listings = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add_product(self, product: Product, listing: str = None, reserved_ids: Iterable[str] = ()) -> str:
+        """Add or replace a product and return its id"""
+        with self.lock:
+            product_id = product.product_id or self._generate_id(reserved_ids)
+            if product_id in self.row_by_id:
+                self._remove_from_indexes(self.row_by_id[product_id])
+                row = self.row_by_id[product_id]
+                self.names[row] = product.name
+                self.categories[row] = sys.intern(product.category.lower())
+                self.units[row] = sys.intern(product.unit)
+                self.prices[row] = float(product.base_price)
+                self.specifications[row] = self._encode_specifications(product.specifications)
+            else:
+                row = len(self.ids)
+                self.ids.append(product_id)
+                self.names.append(product.name)
+                self.categories.append(sys.intern(product.category.lower()))
+                self.units.append(sys.intern(product.unit))
+                self.prices.append(float(product.base_price))
+                self.specifications.append(self._encode_specifications(product.specifications))
+                self.row_by_id[product_id] = row
+
+            self.category_index.setdefault(self.categories[row], []).append(row)
+            self.band_index.setdefault(self.get_price_band(self.prices[row]), []).append(row)
+
+            if listing:
+                self.listings[row] = listing
+            else:
+                self.listings.pop(row, None)
+            return product_id
+
+    def load_jsonl(self, path: str) -> int:
+        """Load products from a JSON Lines file, one product per line"""
+        with open(path, encoding='utf-8') as handle:
+            records = [json.loads(line) for line in handle if line.strip()]
+        return self._add_records(records, path)
+
+    def load_csv(self, path: str) -> int:
+        """Load products from a CSV file with a header row"""
+        records = []
+        with open(path, newline='', encoding='utf-8') as handle:
+            for record in csv.DictReader(handle):
+                specifications = {}
+                if record.get('specifications'):
+                    specifications = json.loads(record['specifications'])
+                for column, value in record.items():
+                    if column not in CORE_FIELDS and value not in (None, ''):
+                        specifications[column] = value
+                record['specifications'] = specifications
+                records.append(record)
+        return self._add_records(records, path)
+
+    def load(self, path: str) -> int:
+        """Load a catalog file, choosing the format from its extension"""
+        if path.lower().endswith('.csv'):
+            return self.load_csv(path)
+        return self.load_jsonl(path)
+
+    def get_product(self, product_id: str) -> Optional[Product]:
+        """Look up a product by id"""
+        row = self.row_by_id.get(product_id)
+        if row is None:
+            return None
+        return self._product_at(row)
+
+    def get_listing(self, product_id: str, price: float = None) -> Optional[str]:
+        """Get a product's listing text, rendering and caching it on first use"""
+        with self.lock:
+            row = self.row_by_id.get(product_id)
+            if row is None:
+                return None
+            # The cache quotes the base price; any other asking price is rendered fresh
+            if price is not None and price != self.prices[row]:
+                return self._render_listing(self._product_at(row), price)
+            if row not in self.listings:
+                self.listings[row] = self._render_listing(self._product_at(row))
+            return self.listings[row]
+
+    def precompute_listings(self) -> int:
+        """Render listing text for every product that does not have one yet"""
+        with self.lock:
+            missing = [row for row in range(len(self.ids)) if row not in self.listings]
+            for row in missing:
+                self.listings[row] = self._render_listing(self._product_at(row))
+            return len(missing)
+
+    def find(self, category: str = None, min_price: float = None, max_price: float = None,
+             limit: int = 50) -> List[Product]:
+        """Find products by category and price range using the indexes"""
+        with self.lock:
+            if category is not None:
+                rows = self.category_index.get(category.lower(), [])
+            elif min_price is not None or max_price is not None:
+                rows = self._rows_in_bands(min_price, max_price)
+            else:
+                rows = range(len(self.ids))
+
+            matches = []
+            for row in rows:
+                price = self.prices[row]
+                if min_price is not None and price < min_price:
+                    continue
+                if max_price is not None and price > max_price:
+                    continue
+                matches.append(row)
+
+            matches.sort(key=lambda row: self.prices[row])
+            return [self._product_at(row) for row in matches[:limit]]
+
+    def get_categories(self) -> Dict[str, int]:
+        """Count products per category"""
+        with self.lock:
+            return {category: len(rows) for category, rows in self.category_index.items()}
+
+    def get_price_band(self, price: float) -> int:
+        """Get the index of the price band a price falls into"""
+        return bisect.bisect_right(self.band_edges, price)
+
+    def _rows_in_bands(self, min_price: Optional[float], max_price: Optional[float]) -> List[int]:
+        low_band = self.get_price_band(min_price) if min_price is not None else 0
+        high_band = self.get_price_band(max_price) if max_price is not None else len(self.band_edges)
+
+        rows = []
+        for band in range(low_band, high_band + 1):
+            rows.extend(self.band_index.get(band, []))
+        return rows
+
+    def _remove_from_indexes(self, row: int):
+        self.category_index[self.categories[row]].remove(row)
+        self.band_index[self.get_price_band(self.prices[row])].remove(row)
+
+    def _generate_id(self, reserved_ids: Iterable[str] = ()) -> str:
+        """Pick an id not used by the catalog or reserved by the batch being loaded"""
+        number = len(self.ids) + 1
+        while f"p{number}" in self.row_by_id or f"p{number}" in reserved_ids:
+            number += 1
+        return f"p{number}"
+
+    def _add_records(self, records: List[Dict], source: str) -> int:
+        """Add loaded records, keeping generated ids clear of the file's own ids"""
+        explicit_ids = [str(record['product_id']) for record in records if record.get('product_id')]
+        reserved_ids = set(explicit_ids)
+
+        duplicates = len(explicit_ids) - len(reserved_ids)
+        if duplicates:
+            logger.warning("%s: %d duplicate product ids, later rows replace earlier ones",
+                           source, duplicates)
+
+        for record in records:
+            self._add_record(record, reserved_ids)
+        return len(records)
+
+    def _add_record(self, record: Dict, reserved_ids: Iterable[str] = ()):
+        product = Product(
+            name=record['name'],
+            category=record.get('category') or 'general',
+            specifications=record.get('specifications') or {},
+            base_price=float(record.get('base_price') or 0),
+            unit=record.get('unit') or 'piece',
+            product_id=str(record.get('product_id') or '')
+        )
+        self.add_product(product, record.get('listing'), reserved_ids)
+
+    def _product_at(self, row: int) -> Product:
+        return Product(
+            name=self.names[row],
+            category=self.categories[row],
+            specifications=json.loads(self.specifications[row]),
+            base_price=self.prices[row],
+            unit=self.units[row],
+            product_id=self.ids[row]
+        )
+
+    def _encode_specifications(self, specifications: Dict) -> str:
+        return json.dumps(specifications or {}, separators=(',', ':'))
+
+    def _render_listing(self, product: Product, price: float = None) -> str:
+        """Build listing text from product data without a model call"""
+        if price is None:
+            price = product.base_price
+        listing = product.name
+        details = describe_specifications(product.specifications)
+        if details:
+            listing += f" - {details}"
+        return (f"{listing}. Asking ${price:,.2f} per {product.unit}. "
+                f"Quality you can count on, and I'm open to a fair offer.")
+
+
+def describe_specifications(specifications: Dict) -> str:
+    """Format specifications as the free-text item details agents expect"""
+    return ', '.join(f"{key}: {value}" for key, value in specifications.items())
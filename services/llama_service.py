@@ -1,7 +1,11 @@
 import requests
 import json
-from typing import Dict, Any
+import time
+from typing import Dict, Any, List, Optional, Tuple
 from config import Config
+from services.metrics_service import MODEL_LATENCY, MODEL_TOKENS, MODEL_ERRORS, CACHE_HITS
+from services.tracing_service import tracer
+from services.cassette_service import cassette
 
 class LlamaService:
     def __init__(self):
@@ -12,13 +16,13 @@ class LlamaService:
             'Content-Type': 'application/json',
             'Accept': 'application/json'
         }
-        
-        # Debug output
-        print(f"🔑 LlamaService initialized with API key: {self.api_key[:10]}...")
-        print(f"🌐 Using endpoint: {self.api_url}")
     
     def generate_response(self, prompt: str, context: Dict = None) -> str:
         """Generate response using Llama 3 8B model"""
+        return self.generate_candidates(prompt, context, 1)[0]
+    
+    def generate_candidates(self, prompt: str, context: Dict = None, n: int = 1) -> List[str]:
+        """Generate n alternative responses from a single model call"""
         try:
             payload = {
                 "model": "meta-llama/Meta-Llama-3-8B-Instruct-Lite",
@@ -35,51 +39,96 @@ class LlamaService:
                 "max_tokens": 200,
                 "temperature": 0.7,
                 "top_p": 0.9,
+                "n": n,
                 "stream": False
             }
             
-            print(f"🔧 Making API request to: {self.api_url}")
-            print(f"🔧 Using model: {payload['model']}")
+            if cassette.replaying:
+                return self._replay(payload, context)
+            
+            started = time.perf_counter()
+            with tracer.span('model_call'):
+                candidates, usage, error = self._post(payload, context)
+            latency = time.perf_counter() - started
+            
+            if error:
+                MODEL_ERRORS.inc(status=error)
+            MODEL_TOKENS.inc(usage.get('prompt_tokens', 0), direction='in')
+            MODEL_TOKENS.inc(usage.get('completion_tokens', 0), direction='out')
             
+            # Failures are recorded too, so a replay fails the same way at the same point
+            if cassette.recording:
+                cassette.record(payload, candidates, latency, usage, error)
+            return candidates
+            
+        except Exception as e:
+            MODEL_ERRORS.inc(status='exception')
+            return [f"❌ Unexpected error: {str(e)}"]
+    
+    def _post(self, payload: Dict, context: Dict) -> Tuple[List[str], Dict, Optional[str]]:
+        """Call the API and return (candidates, usage, error status)"""
+        try:
+            started = time.perf_counter()
             response = requests.post(
                 self.api_url,
                 headers=self.headers,
                 json=payload,
                 timeout=30
             )
-            
-            print(f"📊 Response Status: {response.status_code}")
+            MODEL_LATENCY.observe(time.perf_counter() - started, role=self._role(context))
             
             if response.status_code == 200:
                 result = response.json()
-                print(f"✅ API Response received")
+                usage = result.get('usage') or {}
                 
                 # Check if response has expected structure
-                if 'choices' in result and len(result['choices']) > 0:
-                    if 'message' in result['choices'][0]:
-                        return result['choices'][0]['message']['content'].strip()
-                    elif 'text' in result['choices'][0]:
-                        return result['choices'][0]['text'].strip()
+                candidates = []
+                for choice in result.get('choices', []):
+                    if 'message' in choice:
+                        candidates.append(choice['message']['content'].strip())
+                    elif 'text' in choice:
+                        candidates.append(choice['text'].strip())
                 
-                return f"Unexpected response structure: {result}"
+                if candidates:
+                    return candidates, usage, None
+                return [f"Unexpected response structure: {result}"], usage, 'no_choices'
                 
             elif response.status_code == 401:
-                return "❌ Authentication Error: Invalid API key"
+                message = "❌ Authentication Error: Invalid API key"
             elif response.status_code == 403:
-                return "❌ Access Denied: Check your API permissions"
+                message = "❌ Access Denied: Check your API permissions"
             elif response.status_code == 429:
-                return "❌ Rate Limited: Too many requests"
+                message = "❌ Rate Limited: Too many requests"
             else:
-                return f"❌ HTTP Error {response.status_code}: {response.text}"
+                message = f"❌ HTTP Error {response.status_code}: {response.text}"
+            return [message], {}, str(response.status_code)
                 
         except requests.exceptions.Timeout:
-            return "❌ Request timeout - API took too long to respond"
+            return ["❌ Request timeout - API took too long to respond"], {}, 'timeout'
         except requests.exceptions.ConnectionError:
-            return "❌ Connection error - Check your internet connection"
+            return ["❌ Connection error - Check your internet connection"], {}, 'connection'
         except ValueError as e:
-            return f"❌ JSON parsing error: {str(e)}"
-        except Exception as e:
-            return f"❌ Unexpected error: {str(e)}"
+            return [f"❌ JSON parsing error: {str(e)}"], {}, 'invalid_json'
+    
+    def _replay(self, payload: Dict, context: Dict) -> List[str]:
+        """Serve a completion from the cassette instead of the API"""
+        started = time.perf_counter()
+        with tracer.span('model_call'):
+            entry = cassette.replay(payload)
+        MODEL_LATENCY.observe(time.perf_counter() - started, role=self._role(context))
+        
+        if entry is None:
+            MODEL_ERRORS.inc(status='cassette_miss')
+            return ["❌ Cassette miss: request was not recorded"]
+        if entry.get('error'):
+            MODEL_ERRORS.inc(status=entry['error'])
+        else:
+            CACHE_HITS.inc(cache='cassette')
+        return entry['candidates']
+    
+    def _role(self, context: Dict) -> str:
+        """Get the agent role used to label metrics"""
+        return context.get('role', 'unknown') if context else 'unknown'
     
     def _build_system_prompt(self, context: Dict) -> str:
         """Build system prompt based on agent context"""
@@ -0,0 +1,159 @@
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: Tuple, extra: Optional[Tuple] = None) -> str:
+    pairs = list(key) + list(extra or ())
+    if not pairs:
+        return ''
+    body = ','.join(f'{name}="{value}"' for name, value in pairs)
+    return '{' + body + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        """Increase the counter for the given label values"""
+        key = _label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self.lock:
+            for key, value in self.values.items():
+                lines.append(f'{self.name}{_format_labels(key)} {_format_value(value)}')
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+        self.function = None
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        with self.lock:
+            self.value = value
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the gauge from a callback at scrape time instead of storing it"""
+        self.function = function
+
+    def render(self) -> List[str]:
+        value = self.function() if self.function else self.value
+        return [
+            f'# HELP {self.name} {self.help_text}',
+            f'# TYPE {self.name} gauge',
+            f'{self.name} {_format_value(value)}'
+        ]
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        """Record one observation for the given label values"""
+        key = _label_key(labels)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][index] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            for key, series in self.series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, series['counts']):
+                    cumulative += count
+                    le = (('le', _format_value(bound)),)
+                    lines.append(f'{self.name}_bucket{_format_labels(key, le)} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(key)} {_format_value(series["sum"])}')
+                lines.append(f'{self.name}_count{_format_labels(key)} {series["count"]}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(Counter(name, help_text))
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._register(Gauge(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets))
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+
+registry = MetricsRegistry()
+
+MODEL_LATENCY = registry.histogram(
+    'negotiation_model_latency_seconds', 'Time spent waiting on the model API')
+TTS_LATENCY = registry.histogram(
+    'negotiation_tts_seconds', 'Time spent speaking a message')
+TURN_LATENCY = registry.histogram(
+    'negotiation_turn_latency_seconds', 'End-to-end time to produce a negotiation turn')
+MODEL_TOKENS = registry.counter(
+    'negotiation_model_tokens_total', 'Tokens reported by the model API usage field')
+CACHE_HITS = registry.counter(
+    'negotiation_cache_hits_total', 'Turns served from a precomputed result')
+MODEL_ERRORS = registry.counter(
+    'negotiation_model_errors_total', 'Failed model API calls by status code or error kind')
+ACTIVE_SESSIONS = registry.gauge(
+    'negotiation_active_sessions', 'Negotiations currently in progress')
+QUEUE_DEPTH = registry.gauge(
+    'negotiation_queue_depth', 'Speculative turns waiting or running on the background worker')
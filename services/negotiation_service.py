@@ -1,40 +1,82 @@
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple, Optional
 from agents.buyer_agent import BuyerAgent
 from agents.seller_agent import SellerAgent
 from services.voice_service import VoiceService
+from services.offer_parser import OfferParser
+from services.catalog_service import ProductCatalog, describe_specifications
+from services.metrics_service import TURN_LATENCY, CACHE_HITS, QUEUE_DEPTH
+from services.tracing_service import tracer
+from models.negotiation_models import Product, NegotiationOffer, NegotiationSession
+from config import Config
+
+# Each round costs one buyer and one seller model call
+CALLS_PER_ROUND = 2
 
 class NegotiationService:
     def __init__(self):
         self.buyer = BuyerAgent("Alex the Buyer")
         self.seller = SellerAgent("Maria the Seller")
         self.voice_service = VoiceService()
+        self.offer_parser = OfferParser()
+        self.catalog = ProductCatalog()
         
         self.current_item = None
         self.negotiation_active = False
         self.rounds_completed = 0
         self.max_rounds = 10
         self.negotiation_history = []
+        self.session = None
+        
+        # One worker: at most one counterpart turn is generated ahead
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.speculation = None
         
     def start_negotiation(self, item: str, item_details: str, 
                          seller_cost: float, seller_target: float, seller_min: float,
-                         buyer_target: float, buyer_max: float) -> Dict:
+                         buyer_target: float, buyer_max: float,
+                         product: Optional[Product] = None, opening: Optional[str] = None) -> Dict:
         """Start a new negotiation session"""
         try:
             # Reset negotiation state
+            self._discard_speculation()
             self.negotiation_active = True
             self.rounds_completed = 0
             self.current_item = item
             self.negotiation_history = []
+            negotiation_id = int(time.time())
+            self.session = NegotiationSession(
+                session_id=str(negotiation_id),
+                product=product or Product(name=item, category='general',
+                                           specifications={'details': item_details},
+                                           base_price=seller_target),
+                buyer_max_price=buyer_max,
+                seller_min_price=seller_min
+            )
+            
+            # Set agent parameters, after any discarded speculation is rolled back
+            self._agent_call(self.seller.set_pricing, seller_cost, seller_target, seller_min)
+            self._agent_call(self.buyer.set_budget, buyer_target, buyer_max)
             
-            # Set agent parameters
-            self.seller.set_pricing(seller_cost, seller_target, seller_min)
-            self.buyer.set_budget(buyer_target, buyer_max)
+            # No price works for both sides, so skip the listing and every round
+            if not self.session.has_agreement_zone():
+                return self._end_on_stalemate(
+                    {'reason': 'no_agreement_zone'},
+                    self.max_rounds,
+                    extra_calls=0 if opening else 1
+                )
             
-            # Seller creates initial listing
-            seller_opening = self.seller.make_initial_listing(item, item_details)
+            # Seller creates initial listing, unless a prepared one is supplied
+            if opening:
+                seller_opening = opening
+                self.seller.add_to_history(seller_opening, self.seller.name)
+                self.seller.last_candidate_report = None
+            else:
+                seller_opening = self.seller.make_initial_listing(item, item_details)
             self._add_to_history("seller", seller_opening)
+            self._record_offer("seller", seller_opening, default_price=seller_target)
             
             # Voice output for seller
             self.voice_service.text_to_speech(seller_opening, "seller")
@@ -43,15 +85,48 @@ class NegotiationService:
                 'success': True,
                 'message': seller_opening,
                 'speaker': 'seller',
-                'negotiation_id': int(time.time()),
-                'round': 0
+                'negotiation_id': negotiation_id,
+                'round': 0,
+                'candidates': self.seller.last_candidate_report
             }
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def start_catalog_negotiation(self, product_id: str, buyer_target: float, buyer_max: float,
+                                  seller_cost: Optional[float] = None,
+                                  seller_target: Optional[float] = None,
+                                  seller_min: Optional[float] = None) -> Dict:
+        """Start a negotiation on a catalog product using its listing at the seller's target price"""
+        product = self.catalog.get_product(product_id)
+        if product is None:
+            return {'success': False, 'error': f'Unknown product: {product_id}'}
+        
+        if seller_target is None:
+            seller_target = product.base_price
+        if seller_min is None:
+            seller_min = round(product.base_price * Config.CATALOG_SELLER_MIN_RATIO, 2)
+        if seller_cost is None:
+            seller_cost = round(product.base_price * Config.CATALOG_COST_RATIO, 2)
+        
+        result = self.start_negotiation(
+            item=product.name,
+            item_details=describe_specifications(product.specifications),
+            seller_cost=seller_cost,
+            seller_target=seller_target,
+            seller_min=seller_min,
+            buyer_target=buyer_target,
+            buyer_max=buyer_max,
+            product=product,
+            opening=self.catalog.get_listing(product_id, seller_target)
+        )
+        if result['success']:
+            result['product'] = product.to_dict()
+        return result
+    
     def process_buyer_response(self, context: Dict) -> Dict:
         """Process buyer's response in negotiation"""
+        started = time.perf_counter()
         try:
             if not self.negotiation_active:
                 return {'success': False, 'error': 'No active negotiation'}
@@ -60,23 +135,26 @@ class NegotiationService:
             last_seller_message = self._get_last_message('seller')
             
             # Generate buyer response
-            buyer_response = self.buyer.generate_response(last_seller_message, {
-                'item': self.current_item,
-                'round': self.rounds_completed
-            })
+            buyer_response = self._generate_turn("buyer", last_seller_message)
             
             self._add_to_history("buyer", buyer_response)
+            self._record_offer("buyer", buyer_response)
             
             # Voice output for buyer
             self.voice_service.text_to_speech(buyer_response, "buyer")
             
             self.rounds_completed += 1
             
+            # Seller starts thinking while the buyer's message is voiced
+            self._speculate("seller", buyer_response)
+            
+            TURN_LATENCY.observe(time.perf_counter() - started, speaker='buyer')
             return {
                 'success': True,
                 'message': buyer_response,
                 'speaker': 'buyer',
-                'round': self.rounds_completed
+                'round': self.rounds_completed,
+                'candidates': self.buyer.last_candidate_report
             }
             
         except Exception as e:
@@ -84,6 +162,7 @@ class NegotiationService:
     
     def process_seller_response(self, context: Dict) -> Dict:
         """Process seller's response in negotiation"""
+        started = time.perf_counter()
         try:
             if not self.negotiation_active:
                 return {'success': False, 'error': 'No active negotiation'}
@@ -92,28 +171,49 @@ class NegotiationService:
             last_buyer_message = self._get_last_message('buyer')
             
             # Generate seller response
-            seller_response = self.seller.generate_response(last_buyer_message, {
-                'item': self.current_item,
-                'round': self.rounds_completed
-            })
+            seller_response = self._generate_turn("seller", last_buyer_message)
             
             self._add_to_history("seller", seller_response)
+            self._record_offer("seller", seller_response)
+            self.session.record_gap()
             
             # Voice output for seller
             self.voice_service.text_to_speech(seller_response, "seller")
             
             # Check for deal conclusion
-            deal_status = self._check_deal_conclusion(seller_response)
+            with tracer.span('deal_check'):
+                deal_status = self._check_deal_conclusion(seller_response)
             
-            return {
+            result = {
                 'success': True,
                 'message': seller_response,
                 'speaker': 'seller',
                 'round': self.rounds_completed,
                 'deal_concluded': deal_status['concluded'],
-                'final_price': deal_status.get('price')
+                'final_price': deal_status.get('price'),
+                'candidates': self.seller.last_candidate_report
             }
             
+            # Stop early once offers have stopped moving
+            if not deal_status['concluded']:
+                stalemate = self._check_stalemate()
+                if stalemate:
+                    self._end_session(stalemate)
+                    result['stalemate'] = stalemate['reason']
+                    result['calls_saved'] = max(self.max_rounds - self.rounds_completed, 0) * CALLS_PER_ROUND
+                    if stalemate['reason'] == 'converged':
+                        result['deal_concluded'] = True
+                        result['final_price'] = stalemate['price']
+            
+            # Buyer starts thinking while the seller's message is voiced,
+            # unless the caller has said this is its last round
+            if (self.negotiation_active and self.rounds_completed < self.max_rounds
+                    and not context.get('final_round')):
+                self._speculate("buyer", seller_response)
+            
+            TURN_LATENCY.observe(time.perf_counter() - started, speaker='seller')
+            return result
+            
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
@@ -126,8 +226,10 @@ class NegotiationService:
                 if not self.negotiation_active:
                     break
                 
+                rounds_left = min(rounds - round_num, self.max_rounds - self.rounds_completed)
+                
                 # Buyer's turn
-                buyer_result = self.process_buyer_response({})
+                buyer_result = self._traced_turn('buyer_turn', self.process_buyer_response, {})
                 if buyer_result['success']:
                     results.append(buyer_result)
                 
@@ -135,10 +237,15 @@ class NegotiationService:
                 time.sleep(2)
                 
                 # Seller's turn
-                seller_result = self.process_seller_response({})
+                seller_result = self._traced_turn('seller_turn', self.process_seller_response,
+                                                  {'final_round': rounds_left <= 1})
                 if seller_result['success']:
                     results.append(seller_result)
                     
+                    if seller_result.get('stalemate'):
+                        results.append(self._stalemate_summary(seller_result['stalemate'], rounds_left - 1))
+                        break
+                    
                     # Check if deal is concluded
                     if seller_result.get('deal_concluded'):
                         break
@@ -155,6 +262,101 @@ class NegotiationService:
         except Exception as e:
             return [{'success': False, 'error': str(e)}]
     
+    def _traced_turn(self, name: str, turn, context: Dict) -> Dict:
+        """Run one turn in its own trace so the pauses between turns are not counted"""
+        trace_id = tracer.start_trace(name)
+        try:
+            result = turn(context)
+        finally:
+            tracer.finish_trace()
+        result['trace_id'] = trace_id
+        return result
+    
+    def intervene(self, speaker: str, message: str) -> Dict:
+        """Record a human-written turn in place of an agent's response"""
+        try:
+            if not self.negotiation_active:
+                return {'success': False, 'error': 'No active negotiation'}
+            if speaker not in ('buyer', 'seller'):
+                return {'success': False, 'error': f'Unknown speaker: {speaker}'}
+            
+            # Anything generated ahead was based on a turn that no longer comes next
+            self._discard_speculation()
+            
+            agent = self.buyer if speaker == 'buyer' else self.seller
+            # Queued behind the rollback; nothing here needs to wait for it
+            self.executor.submit(agent.add_to_history, message, agent.name)
+            self._add_to_history(speaker, message)
+            self._record_offer(speaker, message)
+            
+            return {
+                'success': True,
+                'message': message,
+                'speaker': speaker,
+                'round': self.rounds_completed
+            }
+            
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def _generate_turn(self, speaker: str, message: str) -> str:
+        """Generate an agent's reply, using a speculative one when it still applies"""
+        speculation = self.speculation
+        if speculation and speculation['speaker'] == speaker and speculation['based_on'] == message:
+            self.speculation = None
+            CACHE_HITS.inc(cache='speculation')
+            with tracer.span('speculation_wait'):
+                return speculation['future'].result()
+        
+        self._discard_speculation()
+        agent = self.buyer if speaker == 'buyer' else self.seller
+        return self._agent_call(agent.generate_response, message, {
+            'item': self.current_item,
+            'round': self.rounds_completed
+        })
+    
+    def _speculate(self, speaker: str, message: str):
+        """Start generating the counterpart's reply in the background"""
+        if not Config.SPECULATIVE_TURNS or not self.negotiation_active:
+            return
+        
+        self._discard_speculation()
+        agent = self.buyer if speaker == 'buyer' else self.seller
+        # Snapshot first: a fast worker could otherwise mutate the agent before it is taken
+        snapshot = agent.snapshot_state()
+        QUEUE_DEPTH.inc()
+        future = self.executor.submit(agent.generate_response, message, {
+            'item': self.current_item,
+            'round': self.rounds_completed
+        })
+        future.add_done_callback(lambda _: QUEUE_DEPTH.dec())
+        self.speculation = {
+            'speaker': speaker,
+            'based_on': message,
+            'snapshot': snapshot,
+            'future': future
+        }
+    
+    def _discard_speculation(self):
+        """Throw away a speculative reply and undo its effect on the agent"""
+        speculation = self.speculation
+        if not speculation:
+            return
+        self.speculation = None
+        
+        if speculation['future'].cancel():
+            return
+        
+        # Already running: roll back on the worker once it finishes. Later agent
+        # work is queued on the same worker (see _agent_call), so it runs after this
+        agent = self.buyer if speculation['speaker'] == 'buyer' else self.seller
+        snapshot = speculation['snapshot']
+        speculation['future'].add_done_callback(lambda _: agent.restore_state(snapshot))
+    
+    def _agent_call(self, method, *args):
+        """Run agent work on the worker so it follows any pending rollback"""
+        return self.executor.submit(method, *args).result()
+    
     def _add_to_history(self, speaker: str, message: str):
         """Add message to negotiation history"""
         self.negotiation_history.append({
@@ -171,6 +373,68 @@ class NegotiationService:
                 return entry['message']
         return ""
     
+    def _record_offer(self, speaker: str, message: str, default_price: Optional[float] = None):
+        """Record the offer made in a message on the session's offer trail"""
+        with tracer.span('parse_offer'):
+            offer = self.offer_parser.parse(message, speaker)
+        
+        if offer is None:
+            # No new number means the speaker is holding their last position
+            trail = self.session.get_offer_trail(speaker)
+            price = trail[-1] if trail else default_price
+            if price is None:
+                return
+            offer = NegotiationOffer(agent_type=speaker, price=price, quantity=1, message=message)
+        
+        offer.conditions['round'] = self.rounds_completed
+        self.session.add_offer(offer)
+    
+    def _check_stalemate(self) -> Optional[Dict]:
+        """Detect convergence, oscillation or impasse from the offer trail"""
+        return self.session.detect_stalemate(Config.STALEMATE_ROUNDS, Config.CONVERGENCE_TOLERANCE)
+    
+    def _end_session(self, stalemate: Dict):
+        """Close the negotiation after a stalemate or convergence"""
+        self.negotiation_active = False
+        self.session.end_reason = stalemate['reason']
+        
+        if stalemate['reason'] == 'converged':
+            self.session.status = 'completed'
+            self.session.final_price = stalemate['price']
+        else:
+            self.session.status = 'failed'
+    
+    def _end_on_stalemate(self, stalemate: Dict, rounds_left: int, extra_calls: int = 0) -> Dict:
+        """End the negotiation before a turn is generated"""
+        self._end_session(stalemate)
+        return {
+            'success': False,
+            'error': 'Negotiation ended early',
+            'stalemate': stalemate['reason'],
+            'calls_saved': max(rounds_left, 0) * CALLS_PER_ROUND + extra_calls
+        }
+    
+    def _stalemate_summary(self, reason: str, rounds_left: int) -> Dict:
+        """Build the system message reported when rounds are skipped"""
+        descriptions = {
+            'converged': 'Offers converged',
+            'oscillating': 'Offers are going back and forth',
+            'no_progress': 'The price gap stopped shrinking',
+            'no_agreement_zone': "The buyer's budget is below the seller's minimum"
+        }
+        calls_saved = max(rounds_left, 0) * CALLS_PER_ROUND
+        
+        return {
+            'success': True,
+            'speaker': 'system',
+            'message': f"{descriptions.get(reason, reason)} - negotiation ended early, {calls_saved} model calls saved.",
+            'stalemate': reason,
+            'deal_concluded': reason == 'converged',
+            'final_price': self.session.final_price,
+            'calls_saved': calls_saved,
+            'round': self.rounds_completed
+        }
+    
     def _check_deal_conclusion(self, message: str) -> Dict:
         """Check if the negotiation has concluded with a deal"""
         # Simple keyword-based detection (can be enhanced with NLP)
@@ -180,12 +444,11 @@ class NegotiationService:
         message_lower = message.lower()
         
         if any(keyword in message_lower for keyword in conclusion_keywords):
-            # Try to extract price (basic implementation)
-            import re
-            price_match = re.search(r'\$(\d+(?:\.\d{2})?)', message)
-            final_price = float(price_match.group(1)) if price_match else None
+            final_price = self.offer_parser.extract_price(message)
             
             self.negotiation_active = False
+            self.session.status = 'completed'
+            self.session.final_price = final_price
             return {
                 'concluded': True,
                 'price': final_price
@@ -201,5 +464,6 @@ class NegotiationService:
             'rounds': self.rounds_completed,
             'history': self.negotiation_history,
             'buyer_target': self.buyer.target_price,
-            'seller_target': self.seller.target_price
+            'seller_target': self.seller.target_price,
+            'session': self.session.to_dict() if self.session else None
         }
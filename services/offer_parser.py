@@ -0,0 +1,167 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+from models.negotiation_models import NegotiationOffer
+
+NUMBER = r'\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?'
+UNIT = r'units?|pieces?|pcs|bags?|boxes|box|kg|kilos?|lbs?|packs?|cases?|items?|dozen'
+
+# Every price, quantity and condition is matched by one alternation so each
+# message is scanned in a single pass
+OFFER_PATTERN = re.compile(
+    rf'between\s+\$\s?(?P<between_low>{NUMBER})\s*(?P<between_low_k>k\b)?'
+    rf'\s+and\s+\$?\s?(?P<between_high>{NUMBER})(?![.,]?\d)\s*(?P<between_high_k>k\b)?'
+    rf'(?!\s*(?:x\s*)?(?:{UNIT})\b)'
+    rf'|\$\s?(?P<range_low>{NUMBER})\s*(?P<range_low_k>k\b)?'
+    rf'(?:\s*[-–]\s*|\s+to\s+)\$?\s?(?P<range_high>{NUMBER})(?![.,]?\d)\s*(?P<range_high_k>k\b)?'
+    rf'(?!\s*(?:x\s*)?(?:{UNIT})\b)'
+    rf'|\$\s?(?P<price>{NUMBER})\s*(?P<price_k>k\b)?'
+    rf'|\b(?P<k_price>{NUMBER})\s?k\b'
+    rf'|\b(?P<word_price>{NUMBER})\s*(?:dollars|usd|bucks)\b'
+    rf'|\b(?P<quantity>\d+)\s*(?:x\s*)?(?P<unit>{UNIT})\b'
+    rf'|(?P<free_shipping>free\s+(?:shipping|delivery))'
+    rf'|(?P<warranty>\d+[-\s](?:year|month)s?\s+warranty)'
+    rf'|(?P<payment_terms>upfront|in\s+advance|cash\s+payment|net\s+\d+|installments?)'
+    rf'|(?P<bulk_discount>bulk|volume\s+discount)',
+    re.IGNORECASE
+)
+
+# Words just before a price that mark it as the speaker's own offer
+OFFER_CUE_PATTERN = re.compile(
+    r'(?:offer(?:ing)?|how about|can do|could do|would do|meet (?:you )?(?:at|in the middle at)|'
+    r'settle (?:on|at|for)|final(?: price)?|deal at|accept|pay|take it for|go (?:down |up )?to)(?:\W+\w+){0,2}\W*$',
+    re.IGNORECASE
+)
+
+# Words just before a price that mark it as a reference to someone else's number
+REFERENCE_CUE_PATTERN = re.compile(
+    r'(?:you asked|asking|your price of|instead of|down from|up from|was|were|listed at)(?:\W+\w+){0,2}\W*$',
+    re.IGNORECASE
+)
+
+# Words just after a price that reject it, e.g. "$400 is far too low"
+REJECTION_CUE_PATTERN = re.compile(
+    r"^\W{0,2}\s*(?:is|was|would be|'s)?\s*(?:far |way |much |a bit |just |still )?"
+    r"(?:too (?:low|high|steep|much|little)|not (?:enough|acceptable|possible)|"
+    r"out of the question|won't work|will not work|doesn't work|does not work)",
+    re.IGNORECASE
+)
+
+CUE_WINDOW = 30
+
+# Cue scores: the speaker's own offer, a neutral mention, someone else's number,
+# and a number the speaker rejects, which is never read as their offer
+OFFER_SCORE = 1
+REFERENCE_SCORE = -1
+REJECTED_SCORE = -2
+
+CONDITION_GROUPS = ('free_shipping', 'warranty', 'payment_terms', 'bulk_discount')
+
+
+class OfferParser:
+    def parse(self, message: str, agent_type: str) -> Optional[NegotiationOffer]:
+        """Extract the price, quantity and conditions offered in a message"""
+        candidates = []
+        quantity = None
+        conditions = {}
+
+        for match in OFFER_PATTERN.finditer(message):
+            groups = match.groupdict()
+
+            if groups['between_low'] or groups['range_low']:
+                prefix = 'between' if groups['between_low'] else 'range'
+                low = self._to_float(groups[f'{prefix}_low'], groups[f'{prefix}_low_k'])
+                high = self._to_float(groups[f'{prefix}_high'], groups[f'{prefix}_high_k'])
+                # A falling "range" is a price followed by some other number
+                candidates.append((match.start(), match.end(), (low, high) if high >= low else low))
+            elif groups['price']:
+                candidates.append((match.start(), match.end(), self._to_float(groups['price'], groups['price_k'])))
+            elif groups['k_price']:
+                candidates.append((match.start(), match.end(), self._to_float(groups['k_price'], 'k')))
+            elif groups['word_price']:
+                candidates.append((match.start(), match.end(), self._to_float(groups['word_price'])))
+            elif groups['quantity']:
+                if quantity is None:
+                    quantity = int(groups['quantity'])
+                    conditions['unit'] = groups['unit'].lower()
+            else:
+                for name in CONDITION_GROUPS:
+                    if groups[name]:
+                        conditions[name] = groups[name].lower()
+                        break
+
+        if not candidates:
+            return None
+
+        value, score = self._select_offer(message, candidates)
+        if score <= REJECTED_SCORE:
+            # Every price mentioned is one the speaker turned down
+            return None
+        if isinstance(value, tuple):
+            low, high = value
+            conditions['price_range'] = [low, high]
+            # A range is read as the end the speaker would prefer
+            price = low if agent_type == 'buyer' else high
+        else:
+            price = value
+
+        return NegotiationOffer(
+            agent_type=agent_type,
+            price=price,
+            quantity=quantity or 1,
+            conditions=conditions,
+            message=message
+        )
+
+    def extract_price(self, message: str) -> Optional[float]:
+        """Extract the price a message settles on, if any"""
+        offer = self.parse(message, 'seller')
+        return offer.price if offer else None
+
+    def parse_transcript(self, history: Iterable[Dict]) -> List[NegotiationOffer]:
+        """Parse a stored negotiation history into the offers made on each turn"""
+        offers = []
+        for entry in history:
+            speaker = entry.get('speaker')
+            if speaker not in ('buyer', 'seller'):
+                continue
+
+            offer = self.parse(entry.get('message', ''), speaker)
+            if offer is None:
+                continue
+            offer.conditions['round'] = entry.get('round')
+            offers.append(offer)
+        return offers
+
+    def parse_transcripts(self, transcripts: Iterable[Iterable[Dict]]) -> List[List[NegotiationOffer]]:
+        """Parse many stored negotiation histories for bulk analytics"""
+        return [self.parse_transcript(history) for history in transcripts]
+
+    def _select_offer(self, message: str, candidates: List[Tuple[int, int, object]]) -> Tuple[object, int]:
+        """Pick the price the speaker is proposing among those mentioned"""
+        best_value = None
+        best_score = None
+
+        for start, end, value in candidates:
+            preceding = message[max(0, start - CUE_WINDOW):start]
+            following = message[end:end + CUE_WINDOW]
+            score = 0
+            if REJECTION_CUE_PATTERN.search(following):
+                score = REJECTED_SCORE
+            elif OFFER_CUE_PATTERN.search(preceding):
+                score = OFFER_SCORE
+            elif REFERENCE_CUE_PATTERN.search(preceding):
+                score = REFERENCE_SCORE
+
+            # Later mentions win ties since counteroffers usually come last
+            if best_score is None or score >= best_score:
+                best_value = value
+                best_score = score
+
+        return best_value, best_score
+
+    def _to_float(self, number: str, suffix: Optional[str] = None) -> float:
+        """Convert a matched amount such as '1,200' or '1.2' + 'k' to a float"""
+        value = float(number.replace(',', ''))
+        if suffix:
+            value *= 1000
+        return value
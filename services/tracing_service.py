@@ -0,0 +1,126 @@
+import cProfile
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class Tracer:
+    def __init__(self):
+        self.local = threading.local()
+        self.recent_traces = deque(maxlen=Config.TRACE_HISTORY)
+        self.lock = threading.Lock()
+        self.profile_rate = Config.PROFILE_SAMPLE_RATE
+        self.profile_dir = Config.PROFILE_DIR
+
+    def start_trace(self, name: str) -> str:
+        """Begin a trace for the current thread and return its id"""
+        trace = {
+            'trace_id': uuid.uuid4().hex[:16],
+            'name': name,
+            'started_at': time.time(),
+            'start': time.perf_counter(),
+            'spans': [],
+            'depth': 0,
+            'profiler': None,
+            'profile_path': None
+        }
+
+        if self.profile_rate and random.random() < self.profile_rate:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                trace['profiler'] = profiler
+            except ValueError:
+                # Another profiler is already running on this interpreter
+                pass
+
+        self.local.trace = trace
+        return trace['trace_id']
+
+    def finish_trace(self) -> Optional[Dict]:
+        """End the current trace, log it if slow and keep it for inspection"""
+        trace = getattr(self.local, 'trace', None)
+        if trace is None:
+            return None
+        self.local.trace = None
+
+        duration = time.perf_counter() - trace['start']
+
+        profiler = trace.pop('profiler')
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(self.profile_dir, exist_ok=True)
+            trace['profile_path'] = os.path.join(self.profile_dir, f"{trace['name']}-{trace['trace_id']}.prof")
+            profiler.dump_stats(trace['profile_path'])
+
+        summary = {
+            'trace_id': trace['trace_id'],
+            'name': trace['name'],
+            'started_at': trace['started_at'],
+            'duration_ms': round(duration * 1000, 2),
+            'spans': sorted(trace['spans'], key=lambda span: (span['offset_ms'], span['depth'])),
+            'profile_path': trace['profile_path'],
+            'slow': duration >= Config.SLOW_TURN_SECONDS
+        }
+
+        if summary['slow']:
+            breakdown = ', '.join(f"{span['name']}={span['duration_ms']}ms" for span in trace['spans'])
+            logger.warning("Slow turn %s (%s): %.0fms [%s]",
+                           trace['trace_id'], trace['name'], summary['duration_ms'], breakdown)
+
+        with self.lock:
+            self.recent_traces.append(summary)
+        return summary
+
+    def current_trace_id(self) -> Optional[str]:
+        """Get the id of the trace running on this thread, if any"""
+        trace = getattr(self.local, 'trace', None)
+        return trace['trace_id'] if trace else None
+
+    @contextmanager
+    def span(self, name: str):
+        """Time a block as a span of the current trace; a no-op outside a trace"""
+        trace = getattr(self.local, 'trace', None)
+        if trace is None:
+            yield
+            return
+
+        started = time.perf_counter()
+        trace['depth'] += 1
+        try:
+            yield
+        finally:
+            trace['depth'] -= 1
+            trace['spans'].append({
+                'name': name,
+                'depth': trace['depth'],
+                'offset_ms': round((started - trace['start']) * 1000, 2),
+                'duration_ms': round((time.perf_counter() - started) * 1000, 2)
+            })
+
+    def get_recent_traces(self, slow_only: bool = False) -> List[Dict]:
+        """Get recently finished traces, newest first"""
+        with self.lock:
+            traces = list(self.recent_traces)
+        if slow_only:
+            traces = [trace for trace in traces if trace['slow']]
+        return list(reversed(traces))
+
+    def set_profiling(self, rate: float):
+        """Profile a fraction of traces with cProfile, 0 to switch off"""
+        self.profile_rate = max(0.0, min(1.0, rate))
+
+    def get_profiling(self) -> Dict:
+        return {'rate': self.profile_rate, 'directory': self.profile_dir}
+
+
+tracer = Tracer()
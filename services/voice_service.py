@@ -1,8 +1,11 @@
 import pyttsx3
 import speech_recognition as sr
 import threading
+import time
 from typing import Optional
 from config import Config
+from services.metrics_service import TTS_LATENCY
+from services.tracing_service import tracer
 
 class VoiceService:
     def __init__(self):
@@ -35,12 +38,16 @@ class VoiceService:
             
             # Speak in a separate thread to avoid blocking
             def speak():
+                started = time.perf_counter()
                 self.tts_engine.say(text)
                 self.tts_engine.runAndWait()
+                TTS_LATENCY.observe(time.perf_counter() - started, role=agent_role)
             
-            thread = threading.Thread(target=speak)
-            thread.daemon = True
-            thread.start()
+            # Playback runs off the request thread; this span only covers dispatch
+            with tracer.span('tts'):
+                thread = threading.Thread(target=speak)
+                thread.daemon = True
+                thread.start()
             
         except Exception as e:
             print(f"TTS Error: {e}")
@@ -0,0 +1,106 @@
+from models.negotiation_models import NegotiationOffer, NegotiationSession, Product
+
+ROUNDS = 3
+TOLERANCE = 0.02
+
+
+def make_session(seller_min=420.0, buyer_max=460.0):
+    return NegotiationSession(
+        session_id='1',
+        product=Product(name='Coffee', category='general'),
+        buyer_max_price=buyer_max,
+        seller_min_price=seller_min
+    )
+
+
+def play(session, turns):
+    """Add (speaker, price) offers, recording the gap after each seller turn"""
+    for speaker, price in turns:
+        session.add_offer(NegotiationOffer(agent_type=speaker, price=price, quantity=1))
+        if speaker == 'seller':
+            session.record_gap()
+
+
+def test_no_agreement_zone():
+    session = make_session(seller_min=600, buyer_max=500)
+    assert session.detect_stalemate(ROUNDS, TOLERANCE) == {'reason': 'no_agreement_zone'}
+
+
+def test_matching_counterpart_price_converges():
+    session = make_session()
+    play(session, [('seller', 490), ('buyer', 440), ('seller', 440)])
+
+    assert session.detect_stalemate(ROUNDS, TOLERANCE) == {'reason': 'converged', 'price': 440}
+
+
+def test_close_offers_split_the_difference():
+    session = make_session()
+    play(session, [('seller', 490), ('buyer', 440), ('seller', 445)])
+
+    assert session.detect_stalemate(ROUNDS, TOLERANCE) == {'reason': 'converged', 'price': 442.5}
+
+
+def test_no_convergence_outside_limits():
+    session = make_session(seller_min=600, buyer_max=900)
+    play(session, [('seller', 800), ('buyer', 400), ('seller', 400)])
+
+    assert session.detect_stalemate(ROUNDS, TOLERANCE) is None
+
+
+def test_no_convergence_when_seller_did_not_move():
+    session = make_session()
+    play(session, [('buyer', 450), ('seller', 450), ('buyer', 450), ('seller', 450)])
+
+    # The seller's position is unchanged, so this turn is not new agreement
+    assert session.detect_stalemate(ROUNDS, TOLERANCE) is None
+
+
+def test_repeated_agreed_price_is_not_reported_as_stalled():
+    session = make_session()
+    play(session, [
+        ('buyer', 440), ('seller', 490),
+        ('buyer', 440), ('seller', 440),
+        ('buyer', 440), ('seller', 440),
+        ('buyer', 440), ('seller', 440),
+        ('buyer', 440), ('seller', 440)
+    ])
+
+    assert session.gap_history == [50, 0, 0, 0, 0]
+    assert not session.is_gap_stalled(ROUNDS, tolerance=440 * TOLERANCE)
+    assert session.detect_stalemate(ROUNDS, TOLERANCE) != {'reason': 'no_progress'}
+
+
+def test_gap_not_shrinking_is_stalled():
+    session = make_session(seller_min=300, buyer_max=600)
+    play(session, [
+        ('buyer', 400), ('seller', 500),
+        ('buyer', 400), ('seller', 500),
+        ('buyer', 400), ('seller', 500),
+        ('buyer', 400), ('seller', 500)
+    ])
+
+    assert session.detect_stalemate(ROUNDS, TOLERANCE) == {'reason': 'no_progress'}
+
+
+def test_shrinking_gap_is_not_stalled():
+    session = make_session(seller_min=300, buyer_max=600)
+    play(session, [
+        ('seller', 500), ('buyer', 400),
+        ('seller', 490), ('buyer', 410),
+        ('seller', 480), ('buyer', 420),
+        ('seller', 470)
+    ])
+
+    assert session.detect_stalemate(ROUNDS, TOLERANCE) is None
+
+
+def test_oscillating_offers():
+    session = make_session(seller_min=300, buyer_max=600)
+    play(session, [
+        ('seller', 500), ('buyer', 300),
+        ('seller', 480), ('buyer', 380),
+        ('seller', 500), ('buyer', 300),
+        ('seller', 480)
+    ])
+
+    assert session.detect_stalemate(ROUNDS, TOLERANCE) == {'reason': 'oscillating'}
@@ -0,0 +1,129 @@
+import pytest
+from services.offer_parser import OfferParser
+
+
+@pytest.fixture
+def parser():
+    return OfferParser()
+
+
+@pytest.mark.parametrize('message, expected', [
+    ('I can let it go for $1,200', 1200.0),
+    ('Final price $1,200.50', 1200.5),
+    ('How about 1.2k?', 1200.0),
+    ('Would you take $1.5k?', 1500.0),
+    ('I will pay 38 dollars', 38.0),
+    ('Asking $45.99', 45.99),
+])
+def test_parses_price_formats(parser, message, expected):
+    assert parser.parse(message, 'buyer').price == expected
+
+
+def test_returns_none_without_price(parser):
+    assert parser.parse('Tell me more about the beans.', 'buyer') is None
+    assert parser.extract_price('Sounds good to me.') is None
+
+
+@pytest.mark.parametrize('message', [
+    'I could do $40-45',
+    'I could do $40 - $45',
+    'I could do $40 to $45',
+    'Somewhere between $40 and $45 works',
+])
+def test_range_uses_speaker_preferred_end(parser, message):
+    buyer = parser.parse(message, 'buyer')
+    seller = parser.parse(message, 'seller')
+
+    assert buyer.conditions['price_range'] == [40.0, 45.0]
+    assert buyer.price == 40.0
+    assert seller.price == 45.0
+
+
+def test_dash_before_quantity_is_not_a_range(parser):
+    offer = parser.parse('I can do $500 - 10 units minimum', 'seller')
+
+    assert offer.price == 500.0
+    assert offer.quantity == 10
+    assert 'price_range' not in offer.conditions
+
+
+def test_deal_price_not_replaced_by_quantity(parser):
+    assert parser.extract_price('Deal! $1,200 - 2 boxes it is, agreed.') == 1200.0
+
+
+def test_falling_range_is_rejected(parser):
+    offer = parser.parse('Best I can do is $50 - 3 of my colleagues agree', 'seller')
+
+    assert offer.price == 50.0
+    assert 'price_range' not in offer.conditions
+
+
+def test_quantity_and_unit(parser):
+    offer = parser.parse('I can offer $40 for 2 bags', 'buyer')
+
+    assert offer.price == 40.0
+    assert offer.quantity == 2
+    assert offer.conditions['unit'] == 'bags'
+
+
+def test_default_quantity_is_one(parser):
+    assert parser.parse('How about $40?', 'buyer').quantity == 1
+
+
+def test_conditions(parser):
+    offer = parser.parse(
+        '$300 with free shipping, a 2-year warranty and payment upfront', 'seller'
+    )
+
+    assert offer.conditions['free_shipping'] == 'free shipping'
+    assert offer.conditions['warranty'] == '2-year warranty'
+    assert offer.conditions['payment_terms'] == 'upfront'
+
+
+def test_offer_cue_beats_quoted_price(parser):
+    message = 'You asked $50, but I can offer you $40.'
+    assert parser.parse(message, 'buyer').price == 40.0
+
+
+def test_reference_cue_skips_counterpart_price(parser):
+    message = 'I can offer $45, down from $50.'
+    assert parser.parse(message, 'seller').price == 45.0
+
+
+def test_later_price_wins_without_cues(parser):
+    assert parser.parse('$50 is steep. $42?', 'buyer').price == 42.0
+
+
+def test_parse_transcript_skips_system_and_priceless_turns(parser):
+    history = [
+        {'speaker': 'seller', 'message': 'Listed at $50', 'round': 0},
+        {'speaker': 'buyer', 'message': 'Tell me more first.', 'round': 1},
+        {'speaker': 'system', 'message': 'Offers converged at $45', 'round': 1},
+        {'speaker': 'buyer', 'message': 'How about $40?', 'round': 1},
+    ]
+
+    offers = parser.parse_transcript(history)
+
+    assert [(offer.agent_type, offer.price) for offer in offers] == [('seller', 50.0), ('buyer', 40.0)]
+    assert offers[1].conditions['round'] == 1
+
+
+def test_parse_transcripts_in_bulk(parser):
+    transcripts = [
+        [{'speaker': 'buyer', 'message': 'How about $40?'}],
+        [{'speaker': 'seller', 'message': 'No numbers here'}],
+    ]
+
+    results = parser.parse_transcripts(transcripts)
+
+    assert len(results) == 2
+    assert results[0][0].price == 40.0
+    assert results[1] == []
+
+
+def test_rejected_price_is_not_an_offer(parser):
+    assert parser.parse('Sorry, $400 is far too low for me.', 'seller') is None
+
+
+def test_counteroffer_after_rejected_price(parser):
+    assert parser.parse('$400 is too low, but I can do $450', 'seller').price == 450.0